@@ -1,25 +1,37 @@
-from typing import Any, Dict, Optional, List
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional, List, Tuple
+
+try:
+    import boto3  # type: ignore
+except ImportError:  # pragma: no cover - import-time guard
+    boto3 = None  # type: ignore[assignment]
 
 
 class BedrockUnavailable(RuntimeError):
     pass
 
 
+@lru_cache(maxsize=8)
+def _cached_client(service: str, region: str):
+    # boto3 clients are expensive to build and safe to share across threads
+    if boto3 is None:
+        raise BedrockUnavailable("boto3 is required to use Bedrock")
+    return boto3.client(service, region_name=region)
+
+
 def get_client(region: str):
-    try:
-        import boto3  # type: ignore
-    except Exception as e:  # pragma: no cover - import-time guard
-        raise BedrockUnavailable("boto3 is required to use Bedrock") from e
-    return boto3.client("bedrock-runtime", region_name=region)
+    return _cached_client("bedrock-runtime", region)
 
 
 def converse(client, **kwargs) -> Dict[str, Any]:
     """Thin wrapper over client.converse.
 
     kwargs should include keys like modelId, messages, system, toolConfig, inferenceConfig,
-    additionalModelRequestFields, guardrailConfig, etc.
+    additionalModelRequestFields, guardrailConfig, etc. Callers must omit unset keys
+    rather than passing None.
     """
-    return client.converse(**{k: v for k, v in kwargs.items() if v is not None})
+    return client.converse(**kwargs)
 
 
 def converse_stream(client, **kwargs) -> Dict[str, Any]:
@@ -27,23 +39,28 @@ def converse_stream(client, **kwargs) -> Dict[str, Any]:
 
     Returns provider response containing 'stream'. Caller is responsible for iterating it.
     """
-    return client.converse_stream(**{k: v for k, v in kwargs.items() if v is not None})
+    return client.converse_stream(**kwargs)
+
+
+# Foundation-model listings are effectively static; refresh them at most this often
+_MODELS_TTL_SECONDS = 300
 
 
 def list_models(region: str) -> List[str]:
     try:
-        import boto3  # type: ignore
-    except Exception as e:  # pragma: no cover
-        raise BedrockUnavailable("boto3 is required to use Bedrock") from e
-    ctl = boto3.client("bedrock", region_name=region)
-    try:
-        resp = ctl.list_foundation_models()
+        ids = _list_models_cached(region, int(time.monotonic() // _MODELS_TTL_SECONDS))
+    except BedrockUnavailable:
+        raise
     except Exception:
         return []
-    models = resp.get("modelSummaries") or []
-    ids: List[str] = []
-    for m in models:
-        mid = m.get("modelId")
-        if isinstance(mid, str):
-            ids.append(mid)
-    return ids
+    return list(ids)
+
+
+@lru_cache(maxsize=8)
+def _list_models_cached(region: str, ttl_epoch: int) -> Tuple[str, ...]:
+    # ttl_epoch only keys the cache; errors propagate and are therefore not cached
+    ctl = _cached_client("bedrock", region)
+    resp = ctl.list_foundation_models()
+    return tuple(
+        m["modelId"] for m in (resp.get("modelSummaries") or []) if isinstance(m.get("modelId"), str)
+    )
@@ -1,11 +1,25 @@
-import json
 import os
+import re
 from dataclasses import dataclass
 from functools import lru_cache
 from typing import Dict, Optional
 
+from .fast_json import loads as _json_loads
 
-@dataclass
+_TRUTHY = frozenset({"1", "true", "yes", "on"})
+
+# Fallback Bedrock modelIds by model family when MODEL_ID_MAP_JSON has no entry
+_MODEL_FAMILY_RE = re.compile(r"(sonnet|haiku|opus)", re.IGNORECASE)
+_FAMILY_TO_ID: Dict[str, str] = {
+    "sonnet": "us.anthropic.claude-sonnet-4-20250514-v1:0",
+    # Default to Claude 3 Haiku unless operator overrides via MODEL_ID_MAP_JSON
+    "haiku": "anthropic.claude-3-haiku-20240307-v1:0",
+    "opus": "us.anthropic.claude-opus-4-20250514-v1:0",
+}
+
+
+# eq=False keeps identity hashing so cached Settings can key other caches
+@dataclass(eq=False, frozen=True, slots=True)
 class Settings:
     aws_region: str
     proxy_api_key: Optional[str]
@@ -13,19 +27,19 @@ class Settings:
     model_id_map: Dict[str, str]
 
 
-def _load_model_id_map() -> Dict[str, str]:
-    raw = os.getenv("MODEL_ID_MAP_JSON", "").strip()
+def _load_model_id_map(raw: str) -> Dict[str, str]:
+    raw = raw.strip()
     if not raw:
         return {}
     # Allow @path to load from file
     if raw.startswith("@"):
         path = raw[1:]
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(path, "rb") as f:
+            return _json_loads(f.read())
     # Otherwise parse as JSON string
     try:
-        return json.loads(raw)
-    except json.JSONDecodeError:
+        return _json_loads(raw)
+    except ValueError:
         # Fallback: try env var that is a single mapping like A=B;C=D
         mapping: Dict[str, str] = {}
         for pair in raw.split(";"):
@@ -37,40 +51,54 @@ def _load_model_id_map() -> Dict[str, str]:
         return mapping
 
 
-@lru_cache(maxsize=1)
-def get_settings() -> Settings:
-    region = os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION")
-    if not region:
-        # Keep flexible; server may start without and fail per-request if needed.
-        region = "us-east-1"
-    proxy_api_key = os.getenv("PROXY_API_KEY")
-    allow_image_url_fetch = os.getenv("ALLOW_IMAGE_URL_FETCH", "false").lower() in {"1", "true", "yes"}
-    model_map = _load_model_id_map()
+@lru_cache(maxsize=8)
+def _settings_for_env(
+    region: str,
+    proxy_api_key: Optional[str],
+    allow_image_url_fetch_raw: str,
+    model_map_raw: str,
+) -> Settings:
     return Settings(
         aws_region=region,
         proxy_api_key=proxy_api_key,
-        allow_image_url_fetch=allow_image_url_fetch,
-        model_id_map=model_map,
+        allow_image_url_fetch=allow_image_url_fetch_raw.lower() in _TRUTHY,
+        model_id_map=_load_model_id_map(model_map_raw),
+    )
+
+
+def get_settings() -> Settings:
+    """Return settings for the current environment.
+
+    Cached per distinct set of env values, so env changes are picked up without
+    re-parsing the model map on every call.
+    """
+    # Keep flexible; server may start without a region and fail per-request if needed.
+    region = os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION") or "us-east-1"
+    return _settings_for_env(
+        region,
+        os.getenv("PROXY_API_KEY"),
+        os.getenv("ALLOW_IMAGE_URL_FETCH", "false"),
+        os.getenv("MODEL_ID_MAP_JSON", ""),
     )
 
 
 def map_model_id(requested_model: str) -> str:
     """Map Anthropic model name to Bedrock modelId.
     """
+    return _map_model_id(requested_model, get_settings())
+
+
+@lru_cache(maxsize=64)
+def _map_model_id(requested_model: str, settings: Settings) -> str:
     if not requested_model:
         raise ValueError("model is required")
-    m = get_settings().model_id_map.get(requested_model)
+    m = settings.model_id_map.get(requested_model)
     if m:
         return m
 
-    normalized = requested_model.lower()
-    if "sonnet" in normalized:
-        return "us.anthropic.claude-sonnet-4-20250514-v1:0"
-    if "haiku" in normalized:
-        # Default to Claude 3 Haiku unless operator overrides via MODEL_ID_MAP_JSON
-        return "anthropic.claude-3-haiku-20240307-v1:0"
-    if "opus" in normalized:
-        return "us.anthropic.claude-opus-4-20250514-v1:0"
+    family = _MODEL_FAMILY_RE.search(requested_model)
+    if family:
+        return _FAMILY_TO_ID[family.group(1).lower()]
 
     raise ValueError(
         "Unknown model name '{model}'. Configure MODEL_ID_MAP_JSON to map it to a Bedrock modelId (e.g., 'anthropic.claude-3-5-sonnet-20240620-v1:0').".format(
@@ -0,0 +1,39 @@
+"""JSON helpers backed by the fastest available library: orjson, then ujson, then stdlib.
+
+``dumps`` always returns compact UTF-8 bytes and ``loads`` accepts str or bytes.
+Decode errors are ValueError subclasses for every backend.
+"""
+import json
+from typing import Any
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+if orjson is None:  # pragma: no cover - exercised only without orjson
+    try:
+        import ujson  # type: ignore
+    except ImportError:
+        ujson = None
+else:
+    ujson = None
+
+
+if orjson is not None:
+    dumps = orjson.dumps
+    loads = orjson.loads
+
+elif ujson is not None:  # pragma: no cover - exercised only without orjson
+
+    def dumps(obj: Any) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode("utf-8")
+
+    loads = ujson.loads
+
+else:  # pragma: no cover - exercised only without orjson/ujson
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    loads = json.loads
@@ -1,12 +1,29 @@
-import base64
-import json
+import binascii
 import logging
+import re
 import socket
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple, Union
 from urllib.error import HTTPError, URLError
 from urllib.parse import urlparse
 from urllib.request import Request, urlopen
 
+from . import fast_json
+
+try:  # Optional SIMD-accelerated decoder; falls back to stdlib when unavailable
+    import pybase64  # type: ignore
+
+    # pybase64 picks the widest SIMD kernel the CPU supports on import. The
+    # bytearray variant skips the final copy into an immutable bytes object.
+    _b64decode: Callable[[str], Any] = getattr(pybase64, "b64decode_as_bytearray", pybase64.b64decode)
+except ImportError:  # pragma: no cover - depends on environment
+    # a2b_base64 accepts ASCII str directly and decodes in a single pass,
+    # skipping the str->bytes copy that base64.b64decode performs first.
+    _b64decode = binascii.a2b_base64
+
 
 class MappingError(Exception):
     pass
@@ -18,16 +35,45 @@ class UnsupportedContentError(MappingError):
 
 _REMOTE_FETCH_TIMEOUT_SECONDS = 10
 _MAX_REMOTE_MEDIA_BYTES = 10 * 1024 * 1024
-_REMOTE_FETCHER: Optional[Callable[[str], Tuple[bytes, Optional[str]]]] = None
-
-
+_REMOTE_READ_CHUNK_BYTES = 64 * 1024
+# Base64 length of the largest accepted inline media payload (same 10MB cap)
+_MAX_INLINE_MEDIA_B64_CHARS = (_MAX_REMOTE_MEDIA_BYTES * 4 // 3) + 4
+# Decoded/fetched media may be a bytearray (preallocated reads, pybase64); Bedrock accepts both
+_MediaBytes = Union[bytes, bytearray]
+_REMOTE_FETCHER: Optional[Callable[[str], Tuple[_MediaBytes, Optional[str]]]] = None
+# Upper bound on concurrent remote media fetches within one request
+_MAX_PARALLEL_FETCHES = 4
+
+
+# Precomputed formats for the most common media types. Each value is just the
+# lowercased subtype, i.e. what _media_format derives for any other type; the
+# table only skips that string work on the hot path.
+_MEDIA_FORMAT: Dict[str, str] = {
+    "image/png": "png",
+    "image/jpeg": "jpeg",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "application/pdf": "pdf",
+    "text/csv": "csv",
+    "text/html": "html",
+}
+
+
+def _media_format(media: Optional[str], default: str) -> str:
+    fmt = _MEDIA_FORMAT.get(media)
+    if fmt is None:
+        fmt = (media[media.rfind("/") + 1:].lower() if media else "") or default
+    return fmt
+
+
+@lru_cache(maxsize=256)
 def _normalize_media_type(media: Optional[str]) -> Optional[str]:
     if not media:
         return None
     return media.split(";", 1)[0].strip().lower()
 
 
-def _fetch_remote_media(url: str) -> Tuple[bytes, Optional[str]]:
+def _fetch_remote_media(url: str) -> Tuple[_MediaBytes, Optional[str]]:
     """Fetch remote media bytes with basic validation and size limits."""
 
     if _REMOTE_FETCHER is not None:
@@ -42,23 +88,46 @@ def _fetch_remote_media(url: str) -> Tuple[bytes, Optional[str]]:
         with urlopen(req, timeout=_REMOTE_FETCH_TIMEOUT_SECONDS) as resp:  # nosec B310 - controlled URL
             content_type = resp.headers.get("Content-Type")
             content_length = resp.headers.get("Content-Length")
+            declared: Optional[int] = None
             if content_length:
                 try:
-                    if int(content_length) > _MAX_REMOTE_MEDIA_BYTES:
-                        raise MappingError("remote media exceeds 10MB limit")
+                    declared = int(content_length)
                 except ValueError:
                     pass
+                else:
+                    # Like http.client, treat a negative length as unknown
+                    if declared < 0:
+                        declared = None
+            if declared is not None and declared > _MAX_REMOTE_MEDIA_BYTES:
+                raise MappingError("remote media exceeds 10MB limit")
+
+            if declared is not None:
+                # Known length: read straight into one preallocated buffer
+                buf = bytearray(declared)
+                view = memoryview(buf)
+                offset = 0
+                while offset < declared:
+                    n = resp.readinto(view[offset:offset + _REMOTE_READ_CHUNK_BYTES])
+                    if not n:
+                        break
+                    offset += n
+                if offset != declared:
+                    raise MappingError(
+                        f"remote media truncated: expected {declared} bytes, got {offset}"
+                    )
+                return buf, content_type
 
-            buf = bytearray()
+            # Unknown length: read in chunks. A single read(limit + 1) would make
+            # http.client preallocate the full 10MB even for a tiny body.
+            data = bytearray()
             while True:
-                chunk = resp.read(8192)
+                chunk = resp.read(_REMOTE_READ_CHUNK_BYTES)
                 if not chunk:
                     break
-                buf.extend(chunk)
-                if len(buf) > _MAX_REMOTE_MEDIA_BYTES:
+                data += chunk
+                if len(data) > _MAX_REMOTE_MEDIA_BYTES:
                     raise MappingError("remote media exceeds 10MB limit")
-
-            return bytes(buf), content_type
+            return data, content_type
     except (HTTPError, URLError, socket.timeout) as exc:  # pragma: no cover - network errors
         raise MappingError(f"failed to fetch remote media: {exc}") from exc
 
@@ -74,41 +143,38 @@ def normalize_content_array(content: Any) -> List[Dict[str, Any]]:
     raise MappingError("content must be a list or string")
 
 
+# No direct 'tool' role in Bedrock; tool results are content blocks under user.
+# Unknown roles default to user.
+_ROLE_MAP: Dict[str, str] = {"user": "user", "assistant": "assistant", "tool": "user"}
+
+
 def map_role(role: str) -> str:
-    if role == "tool":
-        # No direct 'tool' role in Bedrock; tool results are content blocks under user
-        return "user"
-    if role in {"user", "assistant"}:
-        return role
-    # Default to user for unknown roles
-    return "user"
+    return _ROLE_MAP.get(role, "user")
 
 
-def _decode_base64_to_bytes(data_b64: str) -> bytes:
-    return base64.b64decode(data_b64, validate=False)
+_B64_WHITESPACE_CHARS = " \t\r\n\x0b\x0c"
+_B64_WHITESPACE = _B64_WHITESPACE_CHARS.encode("ascii")
+
+
+def _decode_base64_to_bytes(data_b64: str) -> _MediaBytes:
+    # Line-wrapped (MIME/PEM style) input knocks decoders off their fast path;
+    # strip whitespace in one C-level pass first. The membership checks are memchr scans.
+    if any(ch in data_b64 for ch in _B64_WHITESPACE_CHARS):
+        data_b64 = data_b64.encode("ascii").translate(None, _B64_WHITESPACE)
+    # Reject oversized payloads before the decoder allocates their output
+    if len(data_b64) > _MAX_INLINE_MEDIA_B64_CHARS:
+        raise MappingError("inline media exceeds 10MB limit")
+    return _b64decode(data_b64)
+
+
+# Runs of anything other than alphanumerics and "-()[]" collapse to one space;
+# \w is str.isalnum() plus "_", so "_" is excluded explicitly.
+_MEDIA_NAME_DISALLOWED_RE = re.compile(r"(?:[^\w\-()\[\]]|_)+")
 
 
 def _sanitize_media_name(value: str, fallback: str) -> str:
     def _clean(raw: str) -> str:
-        cleaned_chars: List[str] = []
-        prev_space = False
-        for ch in raw:
-            if ch.isalnum():
-                cleaned_chars.append(ch)
-                prev_space = False
-            elif ch in "-()[]":
-                cleaned_chars.append(ch)
-                prev_space = False
-            elif ch.isspace():
-                if not prev_space:
-                    cleaned_chars.append(" ")
-                    prev_space = True
-            else:
-                if not prev_space:
-                    cleaned_chars.append(" ")
-                    prev_space = True
-        cleaned = "".join(cleaned_chars).strip()
-        return cleaned
+        return _MEDIA_NAME_DISALLOWED_RE.sub(" ", raw).strip()
 
     for candidate in (value, fallback):
         if candidate:
@@ -118,23 +184,32 @@ def _sanitize_media_name(value: str, fallback: str) -> str:
     return fallback or "document"
 
 
+@lru_cache(maxsize=1024)
+def _url_basename(url: str) -> str:
+    return urlparse(url).path.rsplit("/", 1)[-1]
+
+
+@lru_cache(maxsize=64)
+def _media_name_fallback(fallback_prefix: str, fmt: str) -> Tuple[str, str]:
+    # (raw fallback, sanitized default name) - only a handful of prefix/format pairs occur
+    fallback = f"{fallback_prefix} {fmt.upper()}" if fmt else fallback_prefix
+    return fallback, _sanitize_media_name(fallback, fallback)
+
+
 def _resolve_media_name(
     part: Dict[str, Any], src: Dict[str, Any], fmt: str, url: Optional[str], fallback_prefix: str
 ) -> str:
     name = part.get("name") or src.get("name") or src.get("filename")
     if not name and url:
-        parsed = urlparse(url)
-        path = parsed.path or ""
-        if path and path != "/":
-            candidate = path.rsplit("/", 1)[-1]
-            if candidate:
-                name = candidate
+        name = _url_basename(url) or None
     if name and "." in name:
         head, tail = name.rsplit(".", 1)
         if head and tail:
             name = f"{head} {tail.upper()}"
-    fallback = f"{fallback_prefix} {fmt.upper()}" if fmt else fallback_prefix
-    return _sanitize_media_name(name or fallback, fallback)
+    fallback, default_name = _media_name_fallback(fallback_prefix, fmt)
+    if not name:
+        return default_name
+    return _sanitize_media_name(name, fallback)
 
 
 def to_bedrock_image(part: Dict[str, Any], allow_url: bool = False) -> Dict[str, Any]:
@@ -142,7 +217,7 @@ def to_bedrock_image(part: Dict[str, Any], allow_url: bool = False) -> Dict[str,
     src_type = src.get("type")
     if src_type == "base64":
         media = src.get("media_type") or "image/png"
-        fmt = media.split("/")[-1].lower()
+        fmt = _media_format(media, "png")
         data = src.get("data") or ""
         name = _resolve_media_name(part, src, fmt, None, "image")
         return {"format": fmt, "name": name, "source": {"bytes": _decode_base64_to_bytes(data)}}
@@ -158,9 +233,9 @@ def to_bedrock_image(part: Dict[str, Any], allow_url: bool = False) -> Dict[str,
             media = "image/png"
         if not media.startswith("image/"):
             raise MappingError(f"remote image must have image/* content-type, got '{media}'")
-        fmt = media.split("/")[-1] or "png"
+        fmt = _media_format(media, "png")
         name = _resolve_media_name(part, src, fmt, url, "image")
-        return {"format": fmt.lower(), "name": name, "source": {"bytes": data}}
+        return {"format": fmt, "name": name, "source": {"bytes": data}}
     raise MappingError(f"unsupported image source type: {src_type}")
 
 
@@ -169,7 +244,7 @@ def to_bedrock_document(part: Dict[str, Any], allow_url: bool = False) -> Dict[s
     src_type = src.get("type")
     if src_type == "base64":
         media = src.get("media_type") or src.get("mediaType") or "application/pdf"
-        fmt = (media.split("/")[-1] or "pdf").lower()
+        fmt = _media_format(media, "pdf")
         data = src.get("data") or ""
         name = _resolve_media_name(part, src, fmt, None, "document")
         return {"format": fmt, "name": name, "source": {"bytes": _decode_base64_to_bytes(data)}}
@@ -183,40 +258,54 @@ def to_bedrock_document(part: Dict[str, Any], allow_url: bool = False) -> Dict[s
         media = _normalize_media_type(src.get("media_type") or src.get("mediaType") or content_type)
         if media and not (media.startswith("application/") or media.startswith("text/")):
             raise MappingError(f"remote document content-type '{media}' is not supported")
-        fmt = (media.split("/")[-1] if media else "octet-stream") or "octet-stream"
+        fmt = _media_format(media, "octet-stream")
         name = _resolve_media_name(part, src, fmt, url, "document")
-        return {"format": fmt.lower(), "name": name, "source": {"bytes": data}}
+        return {"format": fmt, "name": name, "source": {"bytes": data}}
     raise MappingError(f"unsupported document source type: {src_type}")
 
 
+def _tool_result_item_text(it: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return {"text": it.get("text", "")}
+
+
+def _tool_result_item_json(it: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return {"json": it.get("json", {})}
+
+
+def _tool_result_item_untyped(it: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # Best-effort: if it looks like JSON payload
+    if "json" in it:
+        return {"json": it.get("json")}
+    if "text" in it:
+        return {"text": it.get("text", "")}
+    return None
+
+
+_TOOL_RESULT_ITEM_HANDLERS: Dict[Any, Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = {
+    "text": _tool_result_item_text,
+    "json": _tool_result_item_json,
+}
+
+
 def to_bedrock_tool_result_content(content: Any) -> List[Dict[str, Any]]:
     # Anthropic tool_result.content can be a string or an array of blocks
-    if content is None:
-        return []
     if isinstance(content, str):
         return [{"text": content}]
+    if content is None:
+        return []
+    if isinstance(content, list):
+        return [
+            block
+            for it in content
+            if type(it) is dict
+            and (block := _TOOL_RESULT_ITEM_HANDLERS.get(it.get("type"), _tool_result_item_untyped)(it)) is not None
+        ]
     if isinstance(content, dict):
         # Treat as structured JSON
         return [{"json": content}]
-    if isinstance(content, list):
-        out: List[Dict[str, Any]] = []
-        for it in content:
-            if isinstance(it, dict):
-                t = it.get("type")
-                if t == "text":
-                    out.append({"text": it.get("text", "")})
-                elif t == "json":
-                    out.append({"json": it.get("json", {})})
-                else:
-                    # Best-effort: if it looks like JSON payload
-                    if "json" in it:
-                        out.append({"json": it.get("json")})
-                    elif "text" in it:
-                        out.append({"text": it.get("text", "")})
-        return out
     # Fallback: dump to JSON string
     try:
-        return [{"text": json.dumps(content)}]
+        return [{"text": fast_json.dumps(content).decode()}]
     except Exception:
         return [{"text": str(content)}]
 
@@ -225,130 +314,242 @@ def from_bedrock_tool_result_content(content: List[Dict[str, Any]]) -> Any:
     # Return a string if single text, else array of blocks for richer data
     if not content:
         return ""
-    if len(content) == 1 and "text" in content[0]:
-        return content[0].get("text", "")
+    if len(content) == 1:
+        text = content[0].get("text")
+        if text is not None:
+            return text
     blocks: List[Dict[str, Any]] = []
+    append = blocks.append
     for it in content:
-        if "text" in it:
-            blocks.append({"type": "text", "text": it.get("text", "")})
-        elif "json" in it:
-            blocks.append({"type": "json", "json": it.get("json", {})})
+        get = it.get
+        text = get("text")
+        if text is not None:
+            append({"type": "text", "text": text})
+            continue
+        payload = get("json")
+        if payload is not None:
+            append({"type": "json", "json": payload})
     return blocks
 
 
+# Shared default for tool_use blocks without input; treated as read-only
+_EMPTY_TOOL_INPUT: Dict[str, Any] = {}
+
+
+def _part_text(part: Dict[str, Any], allow_url: bool) -> Dict[str, Any]:
+    return {"text": part.get("text", "")}
+
+
+def _part_image(part: Dict[str, Any], allow_url: bool) -> Dict[str, Any]:
+    return {"image": to_bedrock_image(part, allow_url)}
+
+
+def _part_document(part: Dict[str, Any], allow_url: bool) -> Dict[str, Any]:
+    return {"document": to_bedrock_document(part, allow_url)}
+
+
+def _part_tool_use(part: Dict[str, Any], allow_url: bool) -> Dict[str, Any]:
+    return {
+        "toolUse": {
+            "toolUseId": part.get("id"),
+            "name": part.get("name"),
+            "input": part.get("input", _EMPTY_TOOL_INPUT),
+        }
+    }
+
+
+def _part_tool_result(part: Dict[str, Any], allow_url: bool) -> Dict[str, Any]:
+    return {
+        "toolResult": {
+            "toolUseId": part.get("tool_use_id"),
+            "content": to_bedrock_tool_result_content(part.get("content")),
+            "status": "error" if part.get("is_error") else "success",
+        }
+    }
+
+
+# Anthropic content block type -> Bedrock block builder
+_PART_HANDLERS: Dict[str, Callable[[Dict[str, Any], bool], Dict[str, Any]]] = {
+    "text": _part_text,
+    "image": _part_image,
+    "document": _part_document,
+    "tool_use": _part_tool_use,
+    "tool_result": _part_tool_result,
+}
+
+
+@dataclass(slots=True)
+class _MessageParts:
+    """Mapped blocks of one message, grouped for ordering."""
+
+    has_text: bool = False
+    # Offset of the first standalone document in other_entries, if any
+    first_document_offset: Optional[int] = None
+    tool_use_ids: List[str] = field(default_factory=list)
+    tool_result_entries: List[Tuple[int, Dict[str, Any], Optional[str]]] = field(default_factory=list)
+    other_entries: List[Tuple[int, Dict[str, Any]]] = field(default_factory=list)
+
+
+def _place_text(parts: _MessageParts, idx: int, part: Dict[str, Any], block: Dict[str, Any]) -> None:
+    parts.has_text = True
+    parts.other_entries.append((idx, block))
+
+
+def _place_image(parts: _MessageParts, idx: int, part: Dict[str, Any], block: Dict[str, Any]) -> None:
+    parts.other_entries.append((idx, block))
+
+
+def _place_document(parts: _MessageParts, idx: int, part: Dict[str, Any], block: Dict[str, Any]) -> None:
+    # Documents following a tool_result are attachments of that result
+    if parts.tool_result_entries and parts.tool_result_entries[-1][0] <= idx:
+        _, tr_block, _ = parts.tool_result_entries[-1]
+        tr_content = tr_block["toolResult"].setdefault("content", [])
+        tr_content.append({"json": block})
+    else:
+        if parts.first_document_offset is None:
+            parts.first_document_offset = len(parts.other_entries)
+        parts.other_entries.append((idx, block))
+
+
+def _place_tool_use(parts: _MessageParts, idx: int, part: Dict[str, Any], block: Dict[str, Any]) -> None:
+    tool_use_id = part.get("id")
+    if tool_use_id:
+        parts.tool_use_ids.append(tool_use_id)
+    parts.other_entries.append((idx, block))
+
+
+def _place_tool_result(parts: _MessageParts, idx: int, part: Dict[str, Any], block: Dict[str, Any]) -> None:
+    parts.tool_result_entries.append((idx, block, part.get("tool_use_id")))
+
+
+_PART_PLACERS: Dict[str, Callable[[_MessageParts, int, Dict[str, Any], Dict[str, Any]], None]] = {
+    "text": _place_text,
+    "image": _place_image,
+    "document": _place_document,
+    "tool_use": _place_tool_use,
+    "tool_result": _place_tool_result,
+}
+
+
+_REMOTE_MEDIA_SOURCE_TYPES = frozenset({"url", "image_url", "document_url"})
+
+
+def _is_remote_media_part(part: Dict[str, Any]) -> bool:
+    src = part.get("source")
+    return isinstance(src, dict) and src.get("type") in _REMOTE_MEDIA_SOURCE_TYPES
+
+
+def _convert_media_parts(
+    anthropic_messages: List[Dict[str, Any]], allow_image_url: bool
+) -> Dict[int, Dict[str, Any]]:
+    """Fetch and convert URL-backed image/document parts up front, keyed by id(part).
+
+    Remote fetches are independent per part and latency-bound, so two or more run
+    concurrently. Base64 parts stay in the sequential pass: binascii decoding holds
+    the GIL, so a pool does not speed them up. Everything order-dependent
+    (tool_use/tool_result pairing) stays in the sequential pass too.
+    """
+    if not allow_image_url:
+        return {}
+    remote_parts = [
+        part
+        for message in anthropic_messages
+        if isinstance(message.get("content"), list)
+        for part in message["content"]
+        if isinstance(part, dict) and part.get("type") in ("image", "document") and _is_remote_media_part(part)
+    ]
+    if len(remote_parts) < 2:
+        return {}
+    # A per-request executor keeps one request's slow URLs from delaying another's
+    with ThreadPoolExecutor(
+        max_workers=min(len(remote_parts), _MAX_PARALLEL_FETCHES), thread_name_prefix="media-fetch"
+    ) as pool:
+        blocks = list(pool.map(lambda part: _PART_HANDLERS[part["type"]](part, allow_image_url), remote_parts))
+    return {id(part): block for part, block in zip(remote_parts, blocks)}
+
+
 def map_messages_to_bedrock(anthropic_messages: List[Dict[str, Any]], allow_image_url: bool) -> List[Dict[str, Any]]:
     logger = logging.getLogger("proxy")
-    logger.debug(f"map_messages_to_bedrock called with {len(anthropic_messages or [])} messages")
-
-    # Log input message structure for debugging
-    for i, msg in enumerate(anthropic_messages or []):
-        role = msg.get("role", "unknown")
-        content = msg.get("content", [])
-        if isinstance(content, list):
-            content_types = [c.get("type") if isinstance(c, dict) else str(type(c)) for c in content]
-            tool_use_ids = [c.get("id") for c in content if isinstance(c, dict) and c.get("type") == "tool_use"]
-            tool_result_ids = [c.get("tool_use_id") for c in content if isinstance(c, dict) and c.get("type") == "tool_result"]
-            logger.debug(f"  INPUT Message {i} ({role}): content_types={content_types}, tool_use_ids={tool_use_ids}, tool_result_ids={tool_result_ids}")
-        else:
-            logger.debug(f"  INPUT Message {i} ({role}): content={type(content)} (non-list)")
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    if debug_enabled:
+        logger.debug(f"map_messages_to_bedrock called with {len(anthropic_messages or [])} messages")
+
+        # Log input message structure for debugging
+        for i, msg in enumerate(anthropic_messages or []):
+            role = msg.get("role", "unknown")
+            content = msg.get("content", [])
+            if isinstance(content, list):
+                content_types = [c.get("type") if isinstance(c, dict) else str(type(c)) for c in content]
+                tool_use_ids = [c.get("id") for c in content if isinstance(c, dict) and c.get("type") == "tool_use"]
+                tool_result_ids = [c.get("tool_use_id") for c in content if isinstance(c, dict) and c.get("type") == "tool_result"]
+                logger.debug(f"  INPUT Message {i} ({role}): content_types={content_types}, tool_use_ids={tool_use_ids}, tool_result_ids={tool_result_ids}")
+            else:
+                logger.debug(f"  INPUT Message {i} ({role}): content={type(content)} (non-list)")
 
     out: List[Dict[str, Any]] = []
-    pending_tool_use_ids: List[str] = []
+    pending_tool_use_ids: Deque[str] = deque()
+    converted_media = _convert_media_parts(anthropic_messages or [], allow_image_url)
+    all_tool_use_ids: Set[str] = set()
+    all_tool_result_ids: Set[str] = set()
 
     for message in anthropic_messages or []:
-        role = map_role(message.get("role", "user"))
-        content = message.get("content", [])
-
-        # Track tool_use_ids from current message BEFORE checking for consecutive assistant logic
-        current_message_tool_use_ids: List[str] = []
-        if role == "assistant":
-            # Pre-scan for tool_use blocks to get the IDs before we process the message
-            for part in content or []:
-                if isinstance(part, dict) and part.get("type") == "tool_use":
-                    tool_use_id = part.get("id")
-                    if tool_use_id:
-                        current_message_tool_use_ids.append(tool_use_id)
+        role = _ROLE_MAP.get(message.get("role", "user"), "user")
 
         # Check for consecutive assistant messages, but only log - don't fix here
         # The final check at the end will handle any unresolved tool_use_ids
-        if pending_tool_use_ids and role == "assistant":
-            logger.debug(f"Consecutive assistant message detected with pending tool_use_ids: {pending_tool_use_ids}")
+        if debug_enabled and pending_tool_use_ids and role == "assistant":
+            logger.debug(f"Consecutive assistant message detected with pending tool_use_ids: {list(pending_tool_use_ids)}")
             logger.debug("Will handle this at the end of message processing")
 
-        has_text = False
-        has_document = False
-        tool_use_ids_in_message: List[str] = []
-        tool_result_entries: List[Tuple[int, Dict[str, Any], Optional[str]]] = []
-        other_entries: List[Tuple[int, Dict[str, Any]]] = []
-
+        parts = _MessageParts()
         content_items = normalize_content_array(message.get("content"))
         for idx, part in enumerate(content_items):
             t = part.get("type")
-            if t == "text":
-                has_text = True
-                block = {"text": part.get("text", "")}
-                other_entries.append((idx, block))
-            elif t == "image":
-                block = {"image": to_bedrock_image(part, allow_image_url)}
-                other_entries.append((idx, block))
-            elif t == "document":
-                document_payload = to_bedrock_document(part, allow_image_url)
-                if tool_result_entries and tool_result_entries[-1][0] <= idx:
-                    _, tr_block, _ = tool_result_entries[-1]
-                    tr_content = tr_block["toolResult"].setdefault("content", [])
-                    tr_content.append({"json": {"document": document_payload}})
-                else:
-                    has_document = True
-                    other_entries.append((idx, {"document": document_payload}))
-            elif t == "tool_use":
-                tool_use_id = part.get("id")
-                if tool_use_id:
-                    tool_use_ids_in_message.append(tool_use_id)
-                block = {
-                    "toolUse": {
-                        "toolUseId": tool_use_id,
-                        "name": part.get("name"),
-                        "input": part.get("input", {}),
-                    }
-                }
-                other_entries.append((idx, block))
-            elif t == "tool_result":
-                tool_use_id = part.get("tool_use_id")
-                block = {
-                    "toolResult": {
-                        "toolUseId": tool_use_id,
-                        "content": to_bedrock_tool_result_content(part.get("content")),
-                        "status": "error" if part.get("is_error") else "success",
-                    }
-                }
-                tool_result_entries.append((idx, block, tool_use_id))
-            else:
+            handler = _PART_HANDLERS.get(t)
+            if handler is None:
                 raise UnsupportedContentError(f"unsupported content type: {t}")
+            block = converted_media.get(id(part)) or handler(part, allow_image_url)
+            _PART_PLACERS[t](parts, idx, part, block)
+
+        has_text = parts.has_text
+        first_document_offset = parts.first_document_offset
+        tool_use_ids_in_message = parts.tool_use_ids
+        tool_result_entries = parts.tool_result_entries
+        all_tool_use_ids.update(tool_use_ids_in_message)
+        all_tool_result_ids.update(tool_use_id for _, _, tool_use_id in tool_result_entries if tool_use_id)
+        other_entries = parts.other_entries
 
         ordered_tool_results: List[Dict[str, Any]] = []
         if tool_result_entries:
             if role != "assistant" and pending_tool_use_ids:
-                def _sort_key(item: Tuple[int, Dict[str, Any], Optional[str]]) -> Tuple[int, int]:
-                    original_index, block, tool_use_id = item
-                    if tool_use_id in pending_tool_use_ids:
-                        return (pending_tool_use_ids.index(tool_use_id), original_index)
-                    return (len(pending_tool_use_ids) + original_index, original_index)
-
-                ordered_tool_results = [block for _, block, _ in sorted(tool_result_entries, key=_sort_key)]
+                pending_positions: Dict[str, int] = {}
+                for position, pending_id in enumerate(pending_tool_use_ids):
+                    pending_positions.setdefault(pending_id, position)
+
+                # Entries are already in content order, so bucketing by pending
+                # position keeps the result stable without a sort; results for
+                # unknown ids keep their original order after the known ones.
+                buckets: List[Optional[List[Dict[str, Any]]]] = [None] * len(pending_tool_use_ids)
+                unknown_results: List[Dict[str, Any]] = []
+                for _, block, tool_use_id in tool_result_entries:
+                    position = pending_positions.get(tool_use_id)
+                    if position is None:
+                        unknown_results.append(block)
+                    elif buckets[position] is None:
+                        buckets[position] = [block]
+                    else:
+                        buckets[position].append(block)
+                ordered_tool_results = [block for bucket in buckets if bucket for block in bucket]
+                ordered_tool_results.extend(unknown_results)
             else:
                 ordered_tool_results = [block for _, block, _ in tool_result_entries]
 
-        ordered_non_tool = [block for _, block in sorted(other_entries, key=lambda item: item[0])]
+        # Placers append in content order, so no re-sort is needed
+        ordered_non_tool = [block for _, block in other_entries]
         content_blocks: List[Dict[str, Any]] = ordered_tool_results + ordered_non_tool
 
-        if has_document and not has_text:
-            placeholder = {"text": "Document attached."}
-            insert_index = len(ordered_tool_results)
-            for offset, block in enumerate(ordered_non_tool):
-                if "document" in block:
-                    insert_index = len(ordered_tool_results) + offset
-                    break
-            content_blocks.insert(insert_index, placeholder)
+        if first_document_offset is not None and not has_text:
+            content_blocks.insert(len(ordered_tool_results) + first_document_offset, {"text": "Document attached."})
 
         emitted_messages: List[Dict[str, Any]] = []
         if role == "user" and ordered_tool_results and pending_tool_use_ids:
@@ -365,26 +566,27 @@ def map_messages_to_bedrock(anthropic_messages: List[Dict[str, Any]], allow_imag
         if role == "assistant":
             pending_tool_use_ids.extend(tool_use_ids_in_message)
         else:
-            for emitted in emitted_messages:
-                tool_result_ids = [
-                    (block.get("toolResult") or {}).get("toolUseId")
-                    for block in emitted.get("content", [])
-                    if "toolResult" in block
-                ]
-
-                if not tool_result_ids:
-                    continue
-
-                for tool_result_id in tool_result_ids:
-                    if not tool_result_id:
-                        continue
-                    if pending_tool_use_ids and tool_result_id == pending_tool_use_ids[0]:
-                        pending_tool_use_ids.pop(0)
-                    elif tool_result_id in pending_tool_use_ids:
-                        pending_tool_use_ids.remove(tool_result_id)
-
-                if not pending_tool_use_ids:
-                    continue
+            # Resolve one pending occurrence per tool_result in a single pass over the
+            # pending list instead of a list.remove() scan per result.
+            resolved = Counter(
+                tool_result_id
+                for emitted in emitted_messages
+                for block in emitted.get("content", [])
+                if "toolResult" in block
+                for tool_result_id in ((block.get("toolResult") or {}).get("toolUseId"),)
+                if tool_result_id
+            )
+            # Results normally arrive in tool_use order: consume them from the front
+            while pending_tool_use_ids and resolved[pending_tool_use_ids[0]] > 0:
+                resolved[pending_tool_use_ids.popleft()] -= 1
+            if +resolved and pending_tool_use_ids:
+                still_pending: Deque[str] = deque()
+                for pending_id in pending_tool_use_ids:
+                    if resolved[pending_id] > 0:
+                        resolved[pending_id] -= 1
+                    else:
+                        still_pending.append(pending_id)
+                pending_tool_use_ids = still_pending
 
             if pending_tool_use_ids:
                 raise MappingError(
@@ -393,59 +595,13 @@ def map_messages_to_bedrock(anthropic_messages: List[Dict[str, Any]], allow_imag
                     )
                 )
 
-    # CRITICAL FIX: Pre-process all messages to split mixed content BEFORE any validation
-    # BUT NEVER split user messages (always creates consecutive users - Bedrock rejects this)
-    logger.debug("PRE-PROCESSING: Splitting mixed content messages to ensure Bedrock compatibility")
-
-    i = 0
-    while i < len(out):
-        message = out[i]
-        content = message.get("content", [])
-
-        if not isinstance(content, list) or len(content) <= 1:
-            i += 1
-            continue
-
-        # Check if this message has mixed content (tool_result + other content types)
-        tool_result_blocks = []
-        other_blocks = []
-
-        for block in content:
-            if isinstance(block, dict) and "toolResult" in block:
-                tool_result_blocks.append(block)
-            else:
-                other_blocks.append(block)
-
-        # If we have both tool_result blocks AND other blocks, check if we should split them
-        if tool_result_blocks and other_blocks:
-            # CRITICAL: Never split user messages as this ALWAYS creates consecutive user messages
-            # Bedrock requires strict alternating user/assistant pattern
-            if message.get("role") == "user":
-                logger.debug(f"KEEPING mixed content at index {i} - cannot split user messages (creates consecutive users): {len(tool_result_blocks)} tool_results + {len(other_blocks)} other blocks")
-                # Don't split - but ensure tool_result blocks come first for better Bedrock parsing
-                message["content"] = tool_result_blocks + other_blocks
-                i += 1
-            else:
-                logger.debug(f"SPLITTING mixed content message at index {i}: {len(tool_result_blocks)} tool_results + {len(other_blocks)} other blocks")
-
-                # First message: only tool_results
-                message["content"] = tool_result_blocks
-
-                # Second message: other content (documents, text, etc.)
-                other_message = {
-                    "role": message["role"],
-                    "content": other_blocks
-                }
-                out.insert(i + 1, other_message)
-
-                # Skip both messages since we've processed them
-                i += 2
-        else:
-            i += 1
-
-    # CRITICAL FIX 2: Merge consecutive user messages to avoid user-user sequences
-    # BUT only merge if neither message contains tool_result blocks (to preserve mixed content splitting)
-    logger.debug("POST-PROCESSING: Merging consecutive user messages to ensure proper conversation flow")
+    # CRITICAL FIX: Split mixed content and merge consecutive user messages in one
+    # forward pass, emitting into a new list instead of inserting/popping in place.
+    # - Mixed tool_result + other content is split, BUT NEVER for user messages
+    #   (always creates consecutive users - Bedrock rejects this)
+    # - Consecutive user messages are merged, but only if neither contains tool_result
+    #   blocks (to preserve mixed content splitting)
+    logger.debug("POST-PROCESSING: Splitting mixed content and merging consecutive user messages")
 
     def has_tool_result(content):
         """Check if message content contains any tool_result blocks"""
@@ -453,73 +609,82 @@ def map_messages_to_bedrock(anthropic_messages: List[Dict[str, Any]], allow_imag
             return False
         return any(isinstance(block, dict) and "toolResult" in block for block in content)
 
-    i = 0
-    while i < len(out) - 1:
-        current_msg = out[i]
-        next_msg = out[i + 1]
-
-        # If both current and next messages are from user, check if we should merge them
-        if (current_msg.get("role") == "user" and next_msg.get("role") == "user"):
-            current_content = current_msg.get("content", [])
-            next_content = next_msg.get("content", [])
-
-            # NEVER merge if either message contains tool_result blocks
-            # This preserves our mixed content splitting
-            if has_tool_result(current_content) or has_tool_result(next_content):
-                logger.debug(f"SKIPPING merge of user messages at indices {i} and {i+1} - contains tool_result blocks")
-                i += 1
-                continue
-
-            logger.debug(f"MERGING consecutive user messages at indices {i} and {i+1}")
-
-            # Ensure both are lists
-            if not isinstance(current_content, list):
-                current_content = [current_content] if current_content else []
-            if not isinstance(next_content, list):
-                next_content = [next_content] if next_content else []
-
-            # Merge the content
-            current_msg["content"] = current_content + next_content
-
-            # Remove the next message
-            out.pop(i + 1)
-
-            # Don't increment i, check the same position again in case of multiple consecutive user messages
-        else:
-            i += 1
-
-    # Enhanced final check: verify all tool_use blocks have corresponding tool_results
-    # This is needed because mixed content splitting can disrupt the tool_use tracking
-    all_tool_use_ids: Set[str] = set()
-    all_tool_result_ids: Set[str] = set()
+    merged: List[Dict[str, Any]] = []
+    # Parallel to `merged`: whether each emitted message carries tool_result blocks
+    merged_has_tool_result: List[bool] = []
+    for i, message in enumerate(out):
+        content = message.get("content", [])
+        candidates = [(message, None)]
 
-    # Collect all tool_use and tool_result IDs from the final message list
-    for msg in out:
-        content = msg.get("content", [])
-        if isinstance(content, list):
+        if isinstance(content, list) and len(content) > 1:
+            # Check if this message has mixed content (tool_result + other content types)
+            tool_result_blocks = []
+            other_blocks = []
             for block in content:
-                if isinstance(block, dict):
-                    if "toolUse" in block:
-                        tool_use_id = block.get("toolUse", {}).get("toolUseId")
-                        if tool_use_id:
-                            all_tool_use_ids.add(tool_use_id)
-                    elif "toolResult" in block:
-                        tool_result_id = block.get("toolResult", {}).get("toolUseId")
-                        if tool_result_id:
-                            all_tool_result_ids.add(tool_result_id)
+                if isinstance(block, dict) and "toolResult" in block:
+                    tool_result_blocks.append(block)
+                else:
+                    other_blocks.append(block)
+            candidates = [(message, bool(tool_result_blocks))]
+
+            if tool_result_blocks and other_blocks:
+                # Bedrock requires strict alternating user/assistant pattern
+                if message.get("role") == "user":
+                    if debug_enabled:
+                        logger.debug(f"KEEPING mixed content at index {i} - cannot split user messages (creates consecutive users): {len(tool_result_blocks)} tool_results + {len(other_blocks)} other blocks")
+                    # Don't split - but ensure tool_result blocks come first for better Bedrock parsing
+                    message["content"] = tool_result_blocks + other_blocks
+                else:
+                    if debug_enabled:
+                        logger.debug(f"SPLITTING mixed content message at index {i}: {len(tool_result_blocks)} tool_results + {len(other_blocks)} other blocks")
+                    # First message: only tool_results; second: other content (documents, text, etc.)
+                    message["content"] = tool_result_blocks
+                    candidates.append(({"role": message["role"], "content": other_blocks}, False))
+
+        for candidate, candidate_has_tool_result in candidates:
+            if candidate_has_tool_result is None:
+                candidate_has_tool_result = has_tool_result(candidate.get("content", []))
+            previous = merged[-1] if merged else None
+            if previous is not None and previous.get("role") == "user" and candidate.get("role") == "user":
+                previous_content = previous.get("content", [])
+                candidate_content = candidate.get("content", [])
+
+                # NEVER merge if either message contains tool_result blocks
+                if merged_has_tool_result[-1] or candidate_has_tool_result:
+                    if debug_enabled:
+                        logger.debug(f"SKIPPING merge of user messages at indices {len(merged) - 1} and {len(merged)} - contains tool_result blocks")
+                else:
+                    if debug_enabled:
+                        logger.debug(f"MERGING consecutive user messages at indices {len(merged) - 1} and {len(merged)}")
+                    # Ensure both are lists
+                    if not isinstance(previous_content, list):
+                        previous_content = [previous_content] if previous_content else []
+                    if not isinstance(candidate_content, list):
+                        candidate_content = [candidate_content] if candidate_content else []
+                    previous["content"] = previous_content + candidate_content
+                    continue
+            merged.append(candidate)
+            merged_has_tool_result.append(candidate_has_tool_result)
+    out = merged
 
+    # Enhanced final check: verify all tool_use blocks have corresponding tool_results.
+    # Post-processing only moves blocks between messages, so the ids collected
+    # during the main loop describe the final message list.
     # Find unresolved tool_use_ids
     unresolved_tool_use_ids = all_tool_use_ids - all_tool_result_ids
 
-    logger.debug(f"Enhanced final check: all_tool_use_ids={sorted(all_tool_use_ids)}, all_tool_result_ids={sorted(all_tool_result_ids)}, unresolved={sorted(unresolved_tool_use_ids)}")
+    if debug_enabled:
+        logger.debug(f"Enhanced final check: all_tool_use_ids={sorted(all_tool_use_ids)}, all_tool_result_ids={sorted(all_tool_result_ids)}, unresolved={sorted(unresolved_tool_use_ids)}")
 
     if unresolved_tool_use_ids:
-        logger.debug(f"Final check: unresolved_tool_use_ids = {sorted(unresolved_tool_use_ids)}")
+        if debug_enabled:
+            logger.debug(f"Final check: unresolved_tool_use_ids = {sorted(unresolved_tool_use_ids)}")
 
         # Create synthetic tool_result blocks for any unresolved tool_use blocks
         synthetic_content: List[Dict[str, Any]] = []
         for tool_use_id in sorted(unresolved_tool_use_ids):
-            logger.debug(f"Creating synthetic tool_result for unresolved {tool_use_id}")
+            if debug_enabled:
+                logger.debug(f"Creating synthetic tool_result for unresolved {tool_use_id}")
             synthetic_content.append({
                 "toolResult": {
                     "toolUseId": tool_use_id,
@@ -535,46 +700,23 @@ def map_messages_to_bedrock(anthropic_messages: List[Dict[str, Any]], allow_imag
                 "content": synthetic_content
             }
             out.append(synthetic_message)
-            logger.debug(f"Added final synthetic user message with {len(synthetic_content)} tool_results")
-
-    # Final verification - check if there are still any unresolved tool_use_ids
-    final_all_tool_use_ids: Set[str] = set()
-    final_all_tool_result_ids: Set[str] = set()
-
-    for msg in out:
-        content = msg.get("content", [])
-        if isinstance(content, list):
-            for block in content:
-                if isinstance(block, dict):
-                    if "toolUse" in block:
-                        tool_use_id = block.get("toolUse", {}).get("toolUseId")
-                        if tool_use_id:
-                            final_all_tool_use_ids.add(tool_use_id)
-                    elif "toolResult" in block:
-                        tool_result_id = block.get("toolResult", {}).get("toolUseId")
-                        if tool_result_id:
-                            final_all_tool_result_ids.add(tool_result_id)
-
-    final_unresolved = final_all_tool_use_ids - final_all_tool_result_ids
-    if final_unresolved:
-        raise MappingError(
-            "tool_result required for tool_use ids: {ids}".format(
-                ids=", ".join(sorted(final_unresolved))
-            )
-        )
+            if debug_enabled:
+                logger.debug(f"Added final synthetic user message with {len(synthetic_content)} tool_results")
+            # Every unresolved id now has a result, so no second scan of `out` is needed
 
     # Log output message structure for debugging
-    logger.debug(f"map_messages_to_bedrock returning {len(out)} messages")
-    for i, msg in enumerate(out):
-        role = msg.get("role", "unknown")
-        content = msg.get("content", [])
-        if isinstance(content, list):
-            content_types = [list(c.keys()) if isinstance(c, dict) else str(type(c)) for c in content]
-            tool_use_ids = [c.get("toolUse", {}).get("toolUseId") for c in content if isinstance(c, dict) and "toolUse" in c]
-            tool_result_ids = [c.get("toolResult", {}).get("toolUseId") for c in content if isinstance(c, dict) and "toolResult" in c]
-            logger.debug(f"  OUTPUT Message {i} ({role}): content_types={content_types}, tool_use_ids={tool_use_ids}, tool_result_ids={tool_result_ids}")
-        else:
-            logger.debug(f"  OUTPUT Message {i} ({role}): content={type(content)} (non-list)")
+    if debug_enabled:
+        logger.debug(f"map_messages_to_bedrock returning {len(out)} messages")
+        for i, msg in enumerate(out):
+            role = msg.get("role", "unknown")
+            content = msg.get("content", [])
+            if isinstance(content, list):
+                content_types = [list(c.keys()) if isinstance(c, dict) else str(type(c)) for c in content]
+                tool_use_ids = [c.get("toolUse", {}).get("toolUseId") for c in content if isinstance(c, dict) and "toolUse" in c]
+                tool_result_ids = [c.get("toolResult", {}).get("toolUseId") for c in content if isinstance(c, dict) and "toolResult" in c]
+                logger.debug(f"  OUTPUT Message {i} ({role}): content_types={content_types}, tool_use_ids={tool_use_ids}, tool_result_ids={tool_result_ids}")
+            else:
+                logger.debug(f"  OUTPUT Message {i} ({role}): content={type(content)} (non-list)")
 
     return out
 
@@ -586,29 +728,38 @@ def map_system_to_bedrock(system: Any) -> Optional[List[Dict[str, str]]]:
         return [{"text": system}]
     # Could be array of content blocks; accept strings inside
     if isinstance(system, list):
-        out: List[Dict[str, str]] = []
-        for s in system:
-            if isinstance(s, str):
-                out.append({"text": s})
-            elif isinstance(s, dict) and s.get("type") == "text":
-                out.append({"text": s.get("text", "")})
+        out = [
+            {"text": s} if type(s) is str else {"text": s.get("text", "")}
+            for s in system
+            if type(s) is str or (type(s) is dict and s.get("type") == "text")
+        ]
         return out or None
     return None
 
 
+# Anthropic tool_choice modes that map to an argument-free Bedrock toolChoice.
+# The returned dicts are shared across requests and must not be mutated.
+_STATIC_TOOL_CHOICES: Dict[str, Dict[str, Any]] = {
+    "auto": {"auto": {}},
+    "none": {"none": {}},
+    "any": {"any": {}},
+}
+
+
+@lru_cache(maxsize=32)
+def _map_tool_choice_str(choice: str) -> Dict[str, Any]:
+    static = _STATIC_TOOL_CHOICES.get(choice.lower())
+    if static is not None:
+        return static
+    raise MappingError(f"unsupported tool_choice value: {choice}")
+
+
 def map_tool_choice(choice: Any) -> Any:
     if choice is None:
-        return {"auto": {}}
+        return _STATIC_TOOL_CHOICES["auto"]
 
     if isinstance(choice, str):
-        lowered = choice.lower()
-        if lowered == "auto":
-            return {"auto": {}}
-        if lowered == "none":
-            return {"none": {}}
-        if lowered == "any":
-            return {"any": {}}
-        raise MappingError(f"unsupported tool_choice value: {choice}")
+        return _map_tool_choice_str(choice)
 
     if isinstance(choice, dict):
         choice_type_raw = choice.get("type")
@@ -616,12 +767,9 @@ def map_tool_choice(choice: Any) -> Any:
         if not choice_type and choice.get("name"):
             choice_type = "tool"
 
-        if choice_type == "auto":
-            return {"auto": {}}
-        if choice_type == "none":
-            return {"none": {}}
-        if choice_type == "any":
-            return {"any": {}}
+        static = _STATIC_TOOL_CHOICES.get(choice_type)
+        if static is not None:
+            return static
         if choice_type == "tool":
             name = choice.get("name")
             if not name:
@@ -632,73 +780,68 @@ def map_tool_choice(choice: Any) -> Any:
     raise MappingError("tool_choice must be a string or dict when provided")
 
 
+def _input_schema(tool: Dict[str, Any]) -> Dict[str, Any]:
+    # Bedrock expects JSON Schema under 'inputSchema'. Some models require {'json': schema} wrapper.
+    schema = tool.get("input_schema") or {}
+    return schema if "json" in schema else {"json": schema}
+
+
 def map_tools_to_bedrock(tools: Optional[List[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
     if not tools:
         return None
-    bed_tools: List[Dict[str, Any]] = []
-    for t in tools:
-        name = t.get("name")
-        desc = t.get("description")
-        schema = t.get("input_schema") or {}
-        # Bedrock expects JSON Schema under 'inputSchema'. Some models require {'json': schema} wrapper.
-        input_schema = schema if "json" in schema else {"json": schema}
-        bed_tools.append({
-            "toolSpec": {
-                "name": name,
-                "description": desc,
-                "inputSchema": input_schema,
+    return {
+        "tools": [
+            {
+                "toolSpec": {
+                    "name": t.get("name"),
+                    "description": t.get("description"),
+                    "inputSchema": _input_schema(t),
+                }
             }
-        })
-    return {"tools": bed_tools}
+            for t in tools
+        ]
+    }
+
+
+# Anthropic request field -> Bedrock inferenceConfig field
+_INFERENCE_KEYS: Tuple[Tuple[str, str], ...] = (
+    ("max_tokens", "maxTokens"),
+    ("temperature", "temperature"),
+    ("top_p", "topP"),
+    ("top_k", "topK"),
+    ("presence_penalty", "presencePenalty"),
+    ("frequency_penalty", "frequencyPenalty"),
+    ("max_output_tokens", "maxOutputTokens"),
+    ("stop_sequences", "stopSequences"),
+)
 
 
 def map_inference_config(body: Dict[str, Any]) -> Dict[str, Any]:
-    cfg: Dict[str, Any] = {}
-    if body.get("max_tokens") is not None:
-        cfg["maxTokens"] = body.get("max_tokens")
-    if body.get("temperature") is not None:
-        cfg["temperature"] = body.get("temperature")
-    if body.get("top_p") is not None:
-        cfg["topP"] = body.get("top_p")
-    if body.get("top_k") is not None:
-        cfg["topK"] = body.get("top_k")
-    if body.get("presence_penalty") is not None:
-        cfg["presencePenalty"] = body.get("presence_penalty")
-    if body.get("frequency_penalty") is not None:
-        cfg["frequencyPenalty"] = body.get("frequency_penalty")
-    if body.get("max_output_tokens") is not None:
-        cfg["maxOutputTokens"] = body.get("max_output_tokens")
-    if body.get("stop_sequences") is not None:
-        cfg["stopSequences"] = body.get("stop_sequences")
-    return cfg
+    return {dst: v for src, dst in _INFERENCE_KEYS if (v := body.get(src)) is not None}
 
 
 def collect_additional_fields(body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     # Best-effort forward compatibility for features like response_format
-    add: Dict[str, Any] = {}
     rf = body.get("response_format")
+    # Pass through any provider-specific fields under a namespaced key
+    provider = body.get("bedrock") or body.get("provider")
+    if not isinstance(provider, dict):
+        # Common case: nothing to forward, so skip building a dict
+        return {"responseFormat": rf} if rf else None
+    add: Dict[str, Any] = {}
     if rf:
         # Anthropic style: {"type": "json_object"}
         add["responseFormat"] = rf
-    # Pass through any provider-specific fields under a namespaced key
-    provider = body.get("bedrock") or body.get("provider")
-    if isinstance(provider, dict):
-        add.update(provider)
+    add.update(provider)
     return add or None
 
 
 def map_stop_reason(sr: Optional[str]) -> Optional[str]:
     if not sr:
         return None
-    # Bedrock already uses Anthropic-like stop reasons in Converse
-    # Map directly with a small alias table
-    alias = {
-        "end_turn": "end_turn",
-        "tool_use": "tool_use",
-        "max_tokens": "max_tokens",
-        "stop_sequence": "stop_sequence",
-    }
-    return alias.get(sr, sr)
+    # Bedrock Converse already uses Anthropic stop reasons (end_turn, tool_use,
+    # max_tokens, stop_sequence); anything else is passed through unchanged.
+    return sr
 
 
 def map_bedrock_message_to_anthropic(msg: Dict[str, Any]) -> Dict[str, Any]:
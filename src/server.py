@@ -1,14 +1,20 @@
 import asyncio
-import uuid
+import atexit
+import secrets
 import logging
-import json
-from typing import Any, Dict, List, Optional
-
-from fastapi import Depends, FastAPI, Header, HTTPException, Response, status
+import logging.handlers
+import queue
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse, StreamingResponse
 
 from .bedrock_client import BedrockUnavailable, converse, converse_stream, get_client
-from .config import get_settings, map_model_id
+from .config import Settings, get_settings, map_model_id
 from .mapping import (
     collect_additional_fields,
     map_bedrock_message_to_anthropic,
@@ -21,10 +27,39 @@ from .mapping import (
     from_bedrock_tool_result_content,
     MappingError,
 )
-from .sse import sse
+from . import fast_json
+from .sse import (
+    sse,
+    sse_content_block_stop,
+    sse_input_json_delta,
+    sse_output_json_delta,
+    sse_text_delta,
+)
+
 
+class _JSONResponse(JSONResponse):
+    # Same role as fastapi's (deprecated) ORJSONResponse: render straight to bytes
+    def render(self, content: Any) -> bytes:
+        return fast_json.dumps(content)
 
-app = FastAPI(title="Claude Code → Bedrock Proxy", version="0.1.0")
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    # Build the shared Bedrock client before serving so the first request does not
+    # pay for boto3 loading its service models; get_client() caches it per region
+    try:
+        await run_in_threadpool(get_client, get_settings().aws_region)
+    except Exception as e:
+        logger.warning(f"Bedrock client warm-up failed: {e}")
+    yield
+
+
+app = FastAPI(
+    title="Claude Code → Bedrock Proxy",
+    version="0.1.0",
+    default_response_class=_JSONResponse,
+    lifespan=_lifespan,
+)
 
 
 # ---- Logging setup ----
@@ -36,50 +71,105 @@ if not logger.handlers:
     sh.setFormatter(fmt)
     fh = logging.FileHandler("proxy_log.txt", mode="a", encoding="utf-8")
     fh.setFormatter(fmt)
-    logger.addHandler(sh)
-    logger.addHandler(fh)
+    # Request threads only enqueue records; a background listener does the I/O
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _log_listener = logging.handlers.QueueListener(log_queue, sh, fh)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
     logger.debug("Done setting up console and file logging")
 
 
+def _sanitize_scalar(value: Any, max_len: int) -> Any:
+    return value
+
+
+def _sanitize_bytes(value: Any, max_len: int) -> Any:
+    return f"<bytes len={len(value)}>"
+
+
+def _sanitize_str(value: str, max_len: int) -> Any:
+    if len(value) > max_len:
+        return value[:max_len] + f"...<truncated len={len(value)}>"
+    return value
+
+
+def _sanitize_list(value: List[Any], max_len: int) -> Any:
+    return [_sanitize_for_log(v, max_len) for v in value]
+
+
+def _sanitize_dict(value: Dict[str, Any], max_len: int) -> Any:
+    out: Dict[str, Any] = {}
+    for k, v in value.items():
+        # Special-case: image sources and content
+        if k == "source" and isinstance(v, dict):
+            src_type = v.get("type")
+            if src_type == "base64":
+                data = v.get("data")
+                if isinstance(data, str):
+                    out[k] = {
+                        **{kk: vv for kk, vv in v.items() if kk != "data"},
+                        "data": f"<base64 len={len(data)}>",
+                    }
+                    continue
+        out[k] = _sanitize_for_log(v, max_len)
+    return out
+
+
+def _sanitize_fallback(value: Any, max_len: int) -> Any:
+    # Subclasses of the dispatched types (e.g. IntEnum) take the isinstance path
+    for base, handler in _SANITIZE_BASES:
+        if isinstance(value, base):
+            return handler(value, max_len)
+    s = str(value)
+    return s[:max_len] + (f"...<truncated len={len(s)}>" if len(s) > max_len else "")
+
+
+# Exact type -> handler; avoids walking an isinstance ladder for every value
+_SANITIZE_HANDLERS: Dict[type, Callable[[Any, int], Any]] = {
+    type(None): _sanitize_scalar,
+    bool: _sanitize_scalar,
+    int: _sanitize_scalar,
+    float: _sanitize_scalar,
+    str: _sanitize_str,
+    bytes: _sanitize_bytes,
+    bytearray: _sanitize_bytes,
+    list: _sanitize_list,
+    dict: _sanitize_dict,
+}
+_SANITIZE_BASES: Tuple[Tuple[type, Callable[[Any, int], Any]], ...] = (
+    ((int, float), _sanitize_scalar),
+    ((bytes, bytearray), _sanitize_bytes),
+    (str, _sanitize_str),
+    (list, _sanitize_list),
+    (dict, _sanitize_dict),
+)
+
+
 def _sanitize_for_log(value: Any, max_len: int = 200) -> Any:
     # Recursively sanitize values for logging to avoid huge blobs and binary dumps
     try:
-        if value is None:
-            return None
-        if isinstance(value, (int, float, bool)):
-            return value
-        if isinstance(value, bytes):
-            return f"<bytes len={len(value)}>"
-        if isinstance(value, str):
-            if len(value) > max_len:
-                return value[:max_len] + f"...<truncated len={len(value)}>"
-            return value
-        if isinstance(value, list):
-            return [_sanitize_for_log(v, max_len) for v in value]
-        if isinstance(value, dict):
-            out: Dict[str, Any] = {}
-            for k, v in value.items():
-                # Special-case: image sources and content
-                if k == "source" and isinstance(v, dict):
-                    src_type = v.get("type")
-                    if src_type == "base64":
-                        data = v.get("data")
-                        if isinstance(data, str):
-                            out[k] = {
-                                **{kk: vv for kk, vv in v.items() if kk != "data"},
-                                "data": f"<base64 len={len(data)}>",
-                            }
-                            continue
-                out[k] = _sanitize_for_log(v, max_len)
-            return out
-        # Fallback to string
-        s = str(value)
-        return s[:max_len] + (f"...<truncated len={len(s)}>" if len(s) > max_len else "")
+        return _SANITIZE_HANDLERS.get(type(value), _sanitize_fallback)(value, max_len)
     except Exception:
         return "<unloggable>"
 
 
-def _require_auth(x_api_key: Optional[str] = Header(default=None, alias="x-api-key")) -> None:
+class _LazyLogJSON:
+    # Sanitizes and serializes only if a handler actually formats the record
+    __slots__ = ("_value",)
+
+    def __init__(self, value: Any) -> None:
+        self._value = value
+
+    def __str__(self) -> str:
+        try:
+            return fast_json.dumps(_sanitize_for_log(self._value)).decode()
+        except Exception:
+            return "<unloggable>"
+
+
+def _require_auth(x_api_key: Optional[str] = Header(default=None, alias="x-api-key")) -> Settings:
+    # Returns the settings it checked against so the handler reuses one snapshot per request
     settings = get_settings()
     if settings.proxy_api_key and x_api_key != settings.proxy_api_key:
         raise HTTPException(
@@ -92,6 +182,7 @@ def _require_auth(x_api_key: Optional[str] = Header(default=None, alias="x-api-k
                 },
             },
         )
+    return settings
 
 
 @app.get("/healthz")
@@ -100,18 +191,17 @@ def healthz() -> Dict[str, str]:
 
 
 def _anthropic_error(status_code: int, message: str, err_type: str = "invalid_request_error") -> JSONResponse:
-    return JSONResponse(
+    return _JSONResponse(
         status_code=status_code,
         content={"type": "error", "error": {"type": err_type, "message": message}},
     )
 
 
 def _gen_msg_id() -> str:
-    return f"msg_{uuid.uuid4().hex[:24]}"
+    return f"msg_{secrets.token_hex(12)}"
 
 
-def _build_bedrock_args(body: Dict[str, Any]) -> Dict[str, Any]:
-    settings = get_settings()
+def _build_bedrock_args(body: Dict[str, Any], settings: Settings) -> Dict[str, Any]:
     try:
         messages = map_messages_to_bedrock(body.get("messages", []), settings.allow_image_url_fetch)
         system = map_system_to_bedrock(body.get("system"))
@@ -128,46 +218,49 @@ def _build_bedrock_args(body: Dict[str, Any]) -> Dict[str, Any]:
         raise HTTPException(status_code=400, detail=str(e))
 
     model_id = map_model_id(body.get("model"))
-    args = {
-        "modelId": model_id,
-        "messages": messages,
-        "system": system,
-        "toolConfig": tool_cfg,
-        "inferenceConfig": inference_cfg or None,
-        "additionalModelRequestFields": additional,
-    }
-    logger.debug(
-        "Built Bedrock args: %s",
-        json.dumps(_sanitize_for_log(args), ensure_ascii=False),
-    )
+    args: Dict[str, Any] = {"modelId": model_id, "messages": messages}
+    # Bedrock rejects explicit None values, so only include keys that are set
+    if system is not None:
+        args["system"] = system
+    if tool_cfg is not None:
+        args["toolConfig"] = tool_cfg
+    if inference_cfg:
+        args["inferenceConfig"] = inference_cfg
+    if additional is not None:
+        args["additionalModelRequestFields"] = additional
+    logger.debug("Built Bedrock args: %s", _LazyLogJSON(args))
     return args
 
 
 @app.post("/v1/messages")
-def create_message(
-    body: Dict[str, Any],
-    response: Response,
-    x_api_key: Optional[str] = Depends(_require_auth),
+async def create_message(
+    request: Request,
+    settings: Settings = Depends(_require_auth),
 ):
+    try:
+        body = fast_json.loads(await request.body())
+    except ValueError:
+        return _anthropic_error(400, "request body must be valid JSON")
+    if not isinstance(body, dict):
+        return _anthropic_error(400, "request body must be a JSON object")
+    # Mapping may fetch remote media and the non-stream path blocks on Bedrock,
+    # so keep the rest of the handler off the event loop
+    return await run_in_threadpool(_handle_message, body, settings)
+
+
+def _handle_message(body: Dict[str, Any], settings: Settings):
     # Non-streaming and streaming supported based on body.stream
     stream = bool(body.get("stream"))
+    logger.debug("Incoming /v1/messages stream=%s body=%s", stream, _LazyLogJSON(body))
     try:
-        logger.debug(
-            "Incoming /v1/messages stream=%s body=%s",
-            stream,
-            json.dumps(_sanitize_for_log(body), ensure_ascii=False),
-        )
-    except Exception:
-        logger.error("Failed to log incoming request body")
-    try:
-        args = _build_bedrock_args(body)
+        args = _build_bedrock_args(body, settings)
     except HTTPException as e:
         logger.error(f"HTTPException error: {e.status_code} - {e.detail}")
         return _anthropic_error(e.status_code, str(e.detail))
 
     # Prepare Bedrock client
     try:
-        client = get_client(get_settings().aws_region)
+        client = get_client(settings.aws_region)
     except BedrockUnavailable as e:
         logger.error(f"BedrockUnavailable error: {str(e)}")
         return _anthropic_error(500, str(e), err_type="provider_error")
@@ -204,30 +297,159 @@ def _non_streaming_response(client, body: Dict[str, Any], args: Dict[str, Any])
             "output_tokens": usage.get("outputTokens"),
         },
     }
-    logger.debug(
-        "Bedrock response (non-stream): %s",
-        json.dumps(_sanitize_for_log(resp), ensure_ascii=False),
-    )
-    logger.debug(
-        "Responding Anthropic message: %s",
-        json.dumps(_sanitize_for_log(result), ensure_ascii=False),
-    )
-    return JSONResponse(status_code=200, content=result)
+    logger.debug("Bedrock response (non-stream): %s", _LazyLogJSON(resp))
+    logger.debug("Responding Anthropic message: %s", _LazyLogJSON(result))
+    return _JSONResponse(status_code=200, content=result)
+
+
+# Upper bound on coalesced SSE bytes per write when the producer runs ahead
+_SSE_FLUSH_BYTES = 4096
+
+
+@dataclass(slots=True)
+class _StreamState:
+    buf: bytearray
+    debug_enabled: bool
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    stop_reason: Optional[str] = None
+
+
+def _emit(state: _StreamState, event: str, data: Dict[str, Any]) -> None:
+    _emit_frame(state, sse(event, data))
+
+
+def _emit_frame(state: _StreamState, line: bytes) -> None:
+    if state.debug_enabled:
+        logger.debug("SSE> %s", line.strip().decode())
+    state.buf += line
+
+
+def _on_content_block_start(cbs: Dict[str, Any], state: _StreamState) -> None:
+    index = cbs.get("index", 0)
+    start = cbs.get("start") or cbs.get("contentBlock") or {}
+    if "text" in start:
+        text_value = start.get("text")
+        if isinstance(text_value, dict):
+            text_value = text_value.get("text", "")
+        payload = {"type": "text", "text": text_value or ""}
+    elif "toolUse" in start:
+        tu = start.get("toolUse", {})
+        payload = {
+            "type": "tool_use",
+            "id": tu.get("toolUseId"),
+            "name": tu.get("name"),
+            "input": tu.get("input") or {},
+        }
+    elif "toolResult" in start:
+        tr = start.get("toolResult", {})
+        content_field = tr.get("content")
+        if isinstance(content_field, list):
+            mapped_content = from_bedrock_tool_result_content(content_field)
+        elif content_field is None:
+            mapped_content = ""
+        else:
+            mapped_content = content_field
+        payload = {
+            "type": "tool_result",
+            "tool_use_id": tr.get("toolUseId"),
+            "is_error": (tr.get("status") == "error"),
+            "content": mapped_content,
+        }
+    else:
+        return
+    _emit(state, "content_block_start", {"index": index, "content_block": payload})
+
+
+def _on_content_block_delta(cbd: Dict[str, Any], state: _StreamState) -> None:
+    index = cbd.get("index", 0)
+    delta = cbd.get("delta", {})
+    if "text" in delta:
+        _emit_frame(state, sse_text_delta(index, delta.get("text", "")))
+    elif "toolUse" in delta:
+        tu = delta.get("toolUse", {})
+        # Bedrock may send partial JSON for the tool input
+        # Try a few potential field names
+        partial = (
+            tu.get("input", {}).get("partialJson")
+            or tu.get("input", {}).get("json")
+            or tu.get("partialJson")
+            or ""
+        )
+        _emit_frame(state, sse_input_json_delta(index, partial))
+    elif "toolResult" in delta:
+        tr = delta.get("toolResult", {})
+        partial = None
+        content_field = tr.get("content")
+        if isinstance(content_field, dict):
+            partial = content_field.get("partialJson")
+        if partial is None:
+            partial = tr.get("partialJson")
+        if partial is not None:
+            _emit_frame(state, sse_output_json_delta(index, partial))
+        # Try text content list format
+        elif isinstance(content_field, list) and content_field:
+            first = content_field[0]
+            if isinstance(first, dict) and "text" in first:
+                _emit(
+                    state,
+                    "content_block_delta",
+                    {"index": index, "delta": {"type": "text_delta", "text": first.get("text", "")}},
+                )
+
+
+def _on_content_block_stop(cbstop: Dict[str, Any], state: _StreamState) -> None:
+    _emit_frame(state, sse_content_block_stop(cbstop.get("index", 0)))
+
+
+def _on_message_stop(ms: Dict[str, Any], state: _StreamState) -> None:
+    state.stop_reason = stop_reason = map_stop_reason(ms.get("stopReason"))
+    input_tokens = state.input_tokens
+    output_tokens = state.output_tokens
+    delta_payload: Dict[str, Any] = {}
+    if stop_reason is not None:
+        delta_payload["stop_reason"] = stop_reason
+        delta_payload["stop_sequence"] = None
+    if input_tokens is not None or output_tokens is not None:
+        delta_payload["usage"] = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+        }
+    if delta_payload:
+        _emit(state, "message_delta", delta_payload)
+    _emit(state, "message_stop", {})
+
+
+def _on_metadata(md: Optional[Dict[str, Any]], state: _StreamState) -> None:
+    usage = (md or {}).get("usage") or {}
+    state.input_tokens = usage.get("inputTokens", state.input_tokens)
+    state.output_tokens = usage.get("outputTokens", state.output_tokens)
+
+
+# Bedrock stream events are dicts with exactly one key naming the event type.
+# messageStart needs no SSE beyond the message_start already sent; unknown
+# event types are ignored.
+_STREAM_EVENT_HANDLERS: Dict[str, Callable[[Any, _StreamState], None]] = {
+    "contentBlockStart": _on_content_block_start,
+    "contentBlockDelta": _on_content_block_delta,
+    "contentBlockStop": _on_content_block_stop,
+    "messageStop": _on_message_stop,
+    "metadata": _on_metadata,
+}
 
 
 def _streaming_response(client, body: Dict[str, Any], args: Dict[str, Any]) -> StreamingResponse:
     async def gen():
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
         # message_start
         msg_id = _gen_msg_id()
         line = sse(
             "message_start",
             {"type": "message", "id": msg_id, "model": body.get("model"), "role": "assistant"},
         )
-        logger.debug("SSE> %s", line.strip())
+        if debug_enabled:
+            logger.debug("SSE> %s", line.strip().decode())
         yield line
-        input_tokens: Optional[int] = None
-        output_tokens: Optional[int] = None
-        stop_reason: Optional[str] = None
 
         # Start Bedrock stream call in a thread to avoid blocking event loop
         loop = asyncio.get_running_loop()
@@ -246,188 +468,73 @@ def _streaming_response(client, body: Dict[str, Any], args: Dict[str, Any]) -> S
                 "error",
                 {"error": {"type": "provider_error", "message": f"Bedrock error: {resp}"}},
             )
-            logger.debug("SSE> %s", line.strip())
+            if debug_enabled:
+                logger.debug("SSE> %s", line.strip().decode())
             yield line
             return
 
         stream = resp.get("stream")
-        try:
-            # Iterate provider event stream in thread
-            def _iter_stream():
+        # One producer drains the provider stream on a worker thread and hands
+        # events to the loop; None marks the end, an Exception is re-raised here
+        events: "asyncio.Queue[Any]" = asyncio.Queue()
+        stop = threading.Event()
+
+        def _produce():
+            try:
+                for evt in stream:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(events.put_nowait, evt)
+            except Exception as exc:
+                if not stop.is_set():
+                    loop.call_soon_threadsafe(events.put_nowait, exc)
+            finally:
+                # Ensure provider stream is closed
                 try:
-                    for evt in stream:
-                        yield evt
-                finally:
-                    # Ensure provider stream is closed
-                    try:
-                        stream.close()
-                    except Exception:
-                        pass
-
-            it = _iter_stream()
+                    stream.close()
+                except Exception:
+                    pass
+                if not stop.is_set():
+                    loop.call_soon_threadsafe(events.put_nowait, None)
+
+        # Coalesce frames for events that are already queued into one write;
+        # flush as soon as the producer has nothing ready so deltas are never held back
+        state = _StreamState(buf=bytearray(), debug_enabled=debug_enabled)
+        buf = state.buf
+        try:
+            loop.run_in_executor(None, _produce)
             while True:
-                evt = await loop.run_in_executor(None, lambda: next(it, None))
+                if buf and (events.empty() or len(buf) >= _SSE_FLUSH_BYTES):
+                    yield bytes(buf)
+                    buf.clear()
+                evt = await events.get()
                 if evt is None:
                     break
-                # AWS Bedrock streams send a dict with exactly one key indicating type
+                if isinstance(evt, Exception):
+                    raise evt
                 try:
-                    if "messageStart" in evt:
-                        # Optionally available; no SSE needed besides message_start we already sent
-                        pass
-                    elif "contentBlockStart" in evt:
-                        cbs = evt["contentBlockStart"]
-                        index = cbs.get("index", 0)
-                        start = cbs.get("start") or cbs.get("contentBlock") or {}
-                        if "text" in start:
-                            text_value = start.get("text")
-                            if isinstance(text_value, dict):
-                                text_value = text_value.get("text", "")
-                            payload = {"type": "text", "text": text_value or ""}
-                            line = sse(
-                                "content_block_start",
-                                {"index": index, "content_block": payload},
-                            )
-                            logger.debug("SSE> %s", line.strip())
-                            yield line
-                        elif "toolUse" in start:
-                            tu = start.get("toolUse", {})
-                            payload = {
-                                "type": "tool_use",
-                                "id": tu.get("toolUseId"),
-                                "name": tu.get("name"),
-                                "input": tu.get("input") or {},
-                            }
-                            line = sse(
-                                "content_block_start",
-                                {"index": index, "content_block": payload},
-                            )
-                            logger.debug("SSE> %s", line.strip())
-                            yield line
-                        elif "toolResult" in start:
-                            tr = start.get("toolResult", {})
-                            content_field = tr.get("content")
-                            if isinstance(content_field, list):
-                                mapped_content = from_bedrock_tool_result_content(content_field)
-                            elif content_field is None:
-                                mapped_content = ""
-                            else:
-                                mapped_content = content_field
-                            payload = {
-                                "type": "tool_result",
-                                "tool_use_id": tr.get("toolUseId"),
-                                "is_error": (tr.get("status") == "error"),
-                                "content": mapped_content,
-                            }
-                            line = sse(
-                                "content_block_start",
-                                {"index": index, "content_block": payload},
-                            )
-                            logger.debug("SSE> %s", line.strip())
-                            yield line
-                    elif "contentBlockDelta" in evt:
-                        cbd = evt["contentBlockDelta"]
-                        index = cbd.get("index", 0)
-                        delta = cbd.get("delta", {})
-                        if "text" in delta:
-                            line = sse(
-                                "content_block_delta",
-                                {"index": index, "delta": {"type": "text_delta", "text": delta.get("text", "")}},
-                            )
-                            logger.debug("SSE> %s", line.strip())
-                            yield line
-                        elif "toolUse" in delta:
-                            tu = delta.get("toolUse", {})
-                            # Bedrock may send partial JSON for the tool input
-                            # Try a few potential field names
-                            partial = (
-                                tu.get("input", {}).get("partialJson")
-                                or tu.get("input", {}).get("json")
-                                or tu.get("partialJson")
-                                or ""
-                            )
-                            line = sse(
-                                "content_block_delta",
-                                {"index": index, "delta": {"type": "input_json_delta", "partial_json": partial}},
-                            )
-                            logger.debug("SSE> %s", line.strip())
-                            yield line
-                        elif "toolResult" in delta:
-                            tr = delta.get("toolResult", {})
-                            partial = None
-                            content_field = tr.get("content")
-                            if isinstance(content_field, dict):
-                                partial = content_field.get("partialJson")
-                            if partial is None:
-                                partial = tr.get("partialJson")
-                            if partial is not None:
-                                line = sse(
-                                    "content_block_delta",
-                                    {"index": index, "delta": {"type": "output_json_delta", "partial_json": partial}},
-                                )
-                                logger.debug("SSE> %s", line.strip())
-                                yield line
-                            else:
-                                # Try text content list format
-                                if isinstance(content_field, list) and content_field:
-                                    first = content_field[0]
-                                    if isinstance(first, dict) and "text" in first:
-                                        line = sse(
-                                            "content_block_delta",
-                                            {"index": index, "delta": {"type": "text_delta", "text": first.get("text", "")}},
-                                        )
-                                        logger.debug("SSE> %s", line.strip())
-                                        yield line
-                    elif "contentBlockStop" in evt:
-                        cbstop = evt["contentBlockStop"]
-                        index = cbstop.get("index", 0)
-                        line = sse("content_block_stop", {"index": index})
-                        logger.debug("SSE> %s", line.strip())
-                        yield line
-                    elif "messageStop" in evt:
-                        ms = evt["messageStop"]
-                        stop_reason = map_stop_reason(ms.get("stopReason"))
-                        if stop_reason is not None or (input_tokens is not None or output_tokens is not None):
-                            delta_payload: Dict[str, Any] = {}
-                            if stop_reason is not None:
-                                delta_payload["stop_reason"] = stop_reason
-                                delta_payload["stop_sequence"] = None
-                            if input_tokens is not None or output_tokens is not None:
-                                delta_payload["usage"] = {
-                                    "input_tokens": input_tokens,
-                                    "output_tokens": output_tokens,
-                                }
-                            if delta_payload:
-                                line = sse("message_delta", delta_payload)
-                                logger.debug("SSE> %s", line.strip())
-                                yield line
-                        line = sse("message_stop", {})
-                        logger.debug("SSE> %s", line.strip())
-                        yield line
-                    elif "metadata" in evt:
-                        md = evt["metadata"] or {}
-                        usage = md.get("usage") or {}
-                        input_tokens = usage.get("inputTokens", input_tokens)
-                        output_tokens = usage.get("outputTokens", output_tokens)
-                    else:
-                        # Unknown chunk – ignore
-                        pass
+                    key = next(iter(evt), None)
+                    handler = _STREAM_EVENT_HANDLERS.get(key)
+                    if handler is not None:
+                        handler(evt[key], state)
                 except Exception as parse_exc:
                     logger.error(f"Stream response parse chunk error: {parse_exc}")
                     # If we cannot parse a chunk, emit error and stop
-                    line = sse(
+                    _emit(
+                        state,
                         "error",
                         {"error": {"type": "stream_parse_error", "message": str(parse_exc)}},
                     )
-                    logger.debug("SSE> %s", line.strip())
-                    yield line
                     break
+            if buf:
+                yield bytes(buf)
         except Exception as e:
             logger.error(f"Stream response parse error: {e}")
-            line = sse("error", {"error": {"type": "provider_error", "message": str(e)}})
-            logger.debug("SSE> %s", line.strip())
-            yield line
+            # Frames already produced before the failure still go out, ahead of the error
+            _emit(state, "error", {"error": {"type": "provider_error", "message": str(e)}})
+            yield bytes(buf)
         finally:
-            # Ensure final message_stop if not already sent? Anthropic requires termination
-            pass
+            # Stops the producer early if the client went away mid-stream
+            stop.set()
 
     return StreamingResponse(gen(), media_type="text/event-stream")
@@ -1,19 +1,63 @@
-import json
 from typing import Any, AsyncGenerator, Dict
 
+from .fast_json import dumps as _json_dumps_min
 
-def _json_dumps_min(obj: Any) -> str:
-    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
 
+# Pre-encoded "event: ...\ndata: " prefixes for the events the proxy emits
+_PREFIX: Dict[str, bytes] = {
+    name: f"event: {name}\ndata: ".encode()
+    for name in (
+        "message_start",
+        "content_block_start",
+        "content_block_delta",
+        "content_block_stop",
+        "message_delta",
+        "message_stop",
+        "error",
+        "ping",
+    )
+}
 
-def sse(event: str, data: Dict[str, Any]) -> str:
-    return f"event: {event}\n" f"data: {_json_dumps_min(data)}\n\n"
 
+def sse(event: str, data: Dict[str, Any]) -> bytes:
+    prefix = _PREFIX.get(event)
+    if prefix is None:
+        prefix = f"event: {event}\ndata: ".encode()
+    return prefix + _json_dumps_min(data) + b"\n\n"
 
-async def ping_sse(interval_seconds: int = 15) -> AsyncGenerator[str, None]:
+
+# Fixed-shape frames emitted per streamed chunk are %-templates over constant
+# bytes; each is byte-identical to the equivalent sse(...) call. Only the
+# index and the string payload go through the JSON encoder.
+_TEXT_DELTA_TMPL = b'event: content_block_delta\ndata: {"index":%b,"delta":{"type":"text_delta","text":%b}}\n\n'
+_INPUT_JSON_DELTA_TMPL = (
+    b'event: content_block_delta\ndata: {"index":%b,"delta":{"type":"input_json_delta","partial_json":%b}}\n\n'
+)
+_OUTPUT_JSON_DELTA_TMPL = (
+    b'event: content_block_delta\ndata: {"index":%b,"delta":{"type":"output_json_delta","partial_json":%b}}\n\n'
+)
+_BLOCK_STOP_TMPL = b'event: content_block_stop\ndata: {"index":%b}\n\n'
+
+
+def sse_text_delta(index: int, text: str) -> bytes:
+    return _TEXT_DELTA_TMPL % (_json_dumps_min(index), _json_dumps_min(text))
+
+
+def sse_input_json_delta(index: int, partial_json: str) -> bytes:
+    return _INPUT_JSON_DELTA_TMPL % (_json_dumps_min(index), _json_dumps_min(partial_json))
+
+
+def sse_output_json_delta(index: int, partial_json: str) -> bytes:
+    return _OUTPUT_JSON_DELTA_TMPL % (_json_dumps_min(index), _json_dumps_min(partial_json))
+
+
+def sse_content_block_stop(index: int) -> bytes:
+    return _BLOCK_STOP_TMPL % _json_dumps_min(index)
+
+
+async def ping_sse(interval_seconds: int = 15) -> AsyncGenerator[bytes, None]:
     import asyncio
 
     while True:
-        yield "event: ping\n\n"
+        yield b"event: ping\n\n"
         await asyncio.sleep(interval_seconds)
-
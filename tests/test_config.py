@@ -1,13 +1,11 @@
 import pytest
 
-from src.config import get_settings, map_model_id
+from src.config import _map_model_id, _settings_for_env, get_settings, map_model_id
 
 
 def _reset_settings_cache() -> None:
-    try:
-        get_settings.cache_clear()
-    except AttributeError:  # pragma: no cover - defensive
-        pass
+    _settings_for_env.cache_clear()
+    _map_model_id.cache_clear()
 
 
 def test_map_model_id_haiku_fallback(monkeypatch):
@@ -31,3 +29,11 @@ def test_map_model_id_unknown_model(monkeypatch):
             map_model_id("claude-foo-bar")
     finally:
         _reset_settings_cache()
+
+
+def test_settings_follow_env_changes(monkeypatch):
+    monkeypatch.setenv("MODEL_ID_MAP_JSON", '{"my-model": "bedrock.model-a"}')
+    assert map_model_id("my-model") == "bedrock.model-a"
+    monkeypatch.setenv("MODEL_ID_MAP_JSON", '{"my-model": "bedrock.model-b"}')
+    assert map_model_id("my-model") == "bedrock.model-b"
+    assert get_settings() is get_settings()
@@ -1,4 +1,6 @@
 import base64
+import io
+import threading
 
 import pytest
 
@@ -50,6 +52,72 @@ def test_map_messages_image_base64():
     assert img["source"]["bytes"] == b"123"
 
 
+def test_map_messages_image_base64_empty_subtype_defaults_to_png():
+    data_b64 = base64.b64encode(b"123").decode()
+    msgs = [
+        {
+            "role": "user",
+            "content": [{"type": "image", "source": {"type": "base64", "media_type": "image/", "data": data_b64}}],
+        }
+    ]
+    out = map_messages_to_bedrock(msgs, allow_image_url=False)
+    img = out[0]["content"][0]["image"]
+    assert img["format"] == "png"
+    assert img["name"] == "image PNG"
+
+
+def test_map_messages_image_base64_line_wrapped():
+    raw = bytes(range(256))
+    encoded = base64.encodebytes(raw).decode()
+    assert "\n" in encoded
+    msgs = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": encoded}}
+            ],
+        }
+    ]
+    out = map_messages_to_bedrock(msgs, allow_image_url=False)
+    assert out[0]["content"][0]["image"]["source"]["bytes"] == raw
+
+
+@pytest.mark.parametrize("sep", ["\r", "\t", "\r\n"])
+def test_map_messages_wrapped_media_at_cap_not_rejected(monkeypatch, sep):
+    raw = bytes(range(48))
+    encoded = base64.b64encode(raw).decode()
+    # Exactly at the cap once whitespace is stripped, well over it before
+    monkeypatch.setattr(mapping_module, "_MAX_INLINE_MEDIA_B64_CHARS", len(encoded))
+    wrapped = sep.join(encoded[i:i + 8] for i in range(0, len(encoded), 8))
+    msgs = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": wrapped}}
+            ],
+        }
+    ]
+    out = map_messages_to_bedrock(msgs, allow_image_url=False)
+    assert out[0]["content"][0]["image"]["source"]["bytes"] == raw
+
+
+def test_map_messages_inline_media_too_large(monkeypatch):
+    monkeypatch.setattr(mapping_module, "_MAX_INLINE_MEDIA_B64_CHARS", 8)
+    msgs = [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "image",
+                    "source": {"type": "base64", "media_type": "image/png", "data": base64.b64encode(b"0123456789").decode()},
+                }
+            ],
+        }
+    ]
+    with pytest.raises(MappingError):
+        map_messages_to_bedrock(msgs, allow_image_url=False)
+
+
 def test_map_messages_document_base64():
     data = base64.b64encode(b"%PDF-1.7\n...").decode()
     msgs = [
@@ -292,6 +360,119 @@ def test_map_messages_document_url_fetch(monkeypatch):
     assert doc["source"]["bytes"] == b"%PDF-1.7"
 
 
+def test_map_messages_remote_media_fetched_concurrently(monkeypatch):
+    # Both fetches must be in flight at once for the barrier to release
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fetch(url):
+        barrier.wait()
+        return url.encode(), "image/png"
+
+    monkeypatch.setattr(mapping_module, "_REMOTE_FETCHER", fetch, raising=False)
+    urls = ["https://example.com/a.png", "https://example.com/b.png"]
+    msgs = [
+        {
+            "role": "user",
+            "content": [{"type": "image", "source": {"type": "url", "url": url}} for url in urls],
+        }
+    ]
+    out = map_messages_to_bedrock(msgs, allow_image_url=True)
+    assert [c["image"]["source"]["bytes"] for c in out[0]["content"]] == [u.encode() for u in urls]
+
+
+def test_map_messages_remote_media_keep_order_when_completed_out_of_order(monkeypatch):
+    urls = [f"https://example.com/{i}.png" for i in range(6)]
+    last_done = threading.Event()
+    completed = []
+
+    def fetch(url):
+        # The first fetch cannot finish until a later one has
+        if url == urls[0]:
+            assert last_done.wait(timeout=5)
+        completed.append(url)
+        if url == urls[1]:
+            last_done.set()
+        return url.encode(), "image/png"
+
+    monkeypatch.setattr(mapping_module, "_REMOTE_FETCHER", fetch, raising=False)
+    msgs = [
+        {
+            "role": "user",
+            "content": [{"type": "image", "source": {"type": "url", "url": url}} for url in urls],
+        }
+    ]
+    out = map_messages_to_bedrock(msgs, allow_image_url=True)
+    assert completed[0] != urls[0]
+    assert [c["image"]["source"]["bytes"] for c in out[0]["content"]] == [u.encode() for u in urls]
+
+
+class FakeHTTPResponse:
+    def __init__(self, body, headers):
+        self._body = io.BytesIO(body)
+        self.headers = headers
+        self.read_sizes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def read(self, size=-1):
+        self.read_sizes.append(size)
+        return self._body.read(size)
+
+    def readinto(self, buf):
+        return self._body.readinto(buf)
+
+
+def _patch_urlopen(monkeypatch, body, headers):
+    monkeypatch.setattr(mapping_module, "_REMOTE_FETCHER", None)
+    monkeypatch.setattr(mapping_module, "urlopen", lambda req, timeout: FakeHTTPResponse(body, headers))
+
+
+@pytest.mark.parametrize("content_length", [None, "5", "-1", "garbage"])
+def test_fetch_remote_media_reads_body(monkeypatch, content_length):
+    headers = {"Content-Type": "image/png"}
+    if content_length is not None:
+        headers["Content-Length"] = content_length
+    _patch_urlopen(monkeypatch, b"12345", headers)
+    data, content_type = mapping_module._fetch_remote_media("https://example.com/a.png")
+    assert data == b"12345"
+    assert content_type == "image/png"
+
+
+def test_fetch_remote_media_unknown_length_reads_in_chunks(monkeypatch):
+    body = b"x" * (mapping_module._REMOTE_READ_CHUNK_BYTES * 2 + 10)
+    resp = FakeHTTPResponse(body, {"Content-Type": "image/png"})
+    monkeypatch.setattr(mapping_module, "_REMOTE_FETCHER", None)
+    monkeypatch.setattr(mapping_module, "urlopen", lambda req, timeout: resp)
+    data, _ = mapping_module._fetch_remote_media("https://example.com/a.png")
+    assert data == body
+    # Never asks http.client for the whole size cap at once
+    assert max(resp.read_sizes) == mapping_module._REMOTE_READ_CHUNK_BYTES
+
+
+def test_fetch_remote_media_truncated_body(monkeypatch):
+    _patch_urlopen(monkeypatch, b"123", {"Content-Length": "5"})
+    with pytest.raises(MappingError, match="truncated"):
+        mapping_module._fetch_remote_media("https://example.com/a.png")
+
+
+def test_fetch_remote_media_declared_too_large(monkeypatch):
+    too_large = str(mapping_module._MAX_REMOTE_MEDIA_BYTES + 1)
+    _patch_urlopen(monkeypatch, b"", {"Content-Length": too_large})
+    with pytest.raises(MappingError, match="10MB"):
+        mapping_module._fetch_remote_media("https://example.com/a.png")
+
+
+def test_fetch_remote_media_undeclared_too_large(monkeypatch):
+    monkeypatch.setattr(mapping_module, "_MAX_REMOTE_MEDIA_BYTES", 4)
+    _patch_urlopen(monkeypatch, b"12345", {})
+    with pytest.raises(MappingError, match="10MB"):
+        mapping_module._fetch_remote_media("https://example.com/a.png")
+
+
 def test_map_document_with_text_no_padding():
     msgs = [
         {
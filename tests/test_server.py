@@ -0,0 +1,53 @@
+import json
+import threading
+
+import pytest
+
+import src.server as server_module
+from src.config import Settings
+
+
+class StubRequest:
+    def __init__(self, body: bytes):
+        self._body = body
+
+    async def body(self) -> bytes:
+        return self._body
+
+
+SETTINGS = Settings(aws_region="us-east-1", proxy_api_key=None, allow_image_url_fetch=False, model_id_map={})
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "raw, message",
+    [
+        (b"{bad", "request body must be valid JSON"),
+        (b"[1]", "request body must be a JSON object"),
+    ],
+)
+async def test_create_message_rejects_invalid_body(raw, message):
+    resp = await server_module.create_message(StubRequest(raw), SETTINGS)
+    assert resp.status_code == 400
+    assert json.loads(resp.body) == {
+        "type": "error",
+        "error": {"type": "invalid_request_error", "message": message},
+    }
+
+
+@pytest.mark.asyncio
+async def test_create_message_handles_body_off_the_event_loop(monkeypatch):
+    calls = []
+
+    def fake_handle(body, settings):
+        calls.append((body, settings, threading.current_thread()))
+        return "handled"
+
+    monkeypatch.setattr(server_module, "_handle_message", fake_handle)
+    resp = await server_module.create_message(StubRequest(b'{"model":"m","messages":[]}'), SETTINGS)
+
+    assert resp == "handled"
+    [(body, settings, thread)] = calls
+    assert body == {"model": "m", "messages": []}
+    assert settings is SETTINGS
+    assert thread is not threading.main_thread()
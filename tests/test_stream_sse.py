@@ -3,6 +3,7 @@ import asyncio
 import pytest
 
 from src.server import _streaming_response
+from src.sse import sse, sse_content_block_stop, sse_input_json_delta, sse_output_json_delta, sse_text_delta
 
 
 async def _collect_stream_text(resp) -> str:
@@ -217,3 +218,47 @@ async def test_stream_mixed_blocks_flow():
     # Usage and stop reason emitted in message_delta
     assert "\"usage\":{\"input_tokens\":7,\"output_tokens\":11}" in payload
     assert "\"stop_reason\":\"end_turn\"" in payload
+
+
+class FailingStream(FakeStream):
+    def __next__(self):
+        evt = next(self._iter)
+        if isinstance(evt, Exception):
+            raise evt
+        return evt
+
+
+class FailingClient(FakeClient):
+    def converse_stream(self, **kwargs):
+        return {"stream": FailingStream(self.events)}
+
+
+@pytest.mark.asyncio
+async def test_stream_provider_error_keeps_earlier_frames():
+    events = [
+        {"contentBlockStart": {"index": 0, "start": {"text": ""}}},
+        {"contentBlockDelta": {"index": 0, "delta": {"text": "Hel"}}},
+        {"contentBlockDelta": {"index": 0, "delta": {"text": "lo"}}},
+        RuntimeError("connection reset"),
+    ]
+    body = {"model": "claude-3-5-sonnet-20240620", "stream": True}
+    args = {"modelId": "anthropic.claude-3-5-sonnet-20240620-v1:0", "messages": []}
+
+    payload = await _collect_stream_text(_streaming_response(FailingClient(events), body, args))
+
+    assert payload.count("event: ") == 5
+    assert "\"text\":\"Hel\"" in payload
+    assert "\"text\":\"lo\"" in payload
+    assert payload.index("\"text\":\"lo\"") < payload.index("event: error")
+    assert "connection reset" in payload
+
+
+def test_specialized_frames_match_generic_sse():
+    for index, text in [(0, "Hel"), (2, "café \"quoted\"\n"), (11, "")]:
+        generic = sse("content_block_delta", {"index": index, "delta": {"type": "text_delta", "text": text}})
+        assert sse_text_delta(index, text) == generic
+        generic = sse("content_block_delta", {"index": index, "delta": {"type": "input_json_delta", "partial_json": text}})
+        assert sse_input_json_delta(index, text) == generic
+        generic = sse("content_block_delta", {"index": index, "delta": {"type": "output_json_delta", "partial_json": text}})
+        assert sse_output_json_delta(index, text) == generic
+        assert sse_content_block_stop(index) == sse("content_block_stop", {"index": index})